@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 import os
 import glob
+import argparse
 import cv2
 import numpy as np
 import re
 import csv
+
+# Optional: numba parallelizes the overlay blend, the one per-pixel loop left
+# on the hot path now that tiles are resized straight into the canvas
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Decode (retrieve) only every Nth grabbed frame; grab() alone advances the
+# stream without paying for the full YUV->BGR decode
+DECODE_INTERVAL = 2
+
+# Per-tick frame budget in seconds; pacing is done explicitly so fast decode
+# paths are not capped by a blocking waitKey
+TARGET_FRAME_TIME = 0.030
+
 # Global variables for click handling
 click_coords = None
 grid_info = {}
@@ -14,6 +32,14 @@ pending_classification = None
 paused = False
 classified_videos = set()  # Track which videos have been manually classified
 
+def gpu_decode_available():
+    """Check for OpenCV's CUDA codec module and at least one CUDA device"""
+    try:
+        return (hasattr(cv2, 'cudacodec') and
+                cv2.cuda.getCudaEnabledDeviceCount() > 0)
+    except cv2.error:
+        return False
+
 def get_available_folders(base_path):
     """Get all available folders in the base path"""
     if not os.path.exists(base_path):
@@ -93,7 +119,17 @@ def load_existing_classifications(csv_filename="video_classifications.csv"):
             print(f"Warning: Could not read existing CSV file: {e}")
     return existing
 
-def draw_label_below(frame, text, width=320, height=240, highlight=False, classified=False):
+# Rendered label strips keyed by (text, highlight, classified); label state
+# rarely changes, so each strip is rendered once and reused
+_LABEL_CACHE = {}
+
+def render_label_strip(text, width=320, highlight=False, classified=False, channels=3):
+    """Render (or fetch from cache) the 30px label strip shown below a tile"""
+    cache_key = (text, highlight, classified, channels)
+    cached = _LABEL_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     label_height = 30
     # Use different colors: green for highlighted, blue for classified, black for default
     if highlight:
@@ -102,42 +138,74 @@ def draw_label_below(frame, text, width=320, height=240, highlight=False, classi
         bg_color = (100, 0, 0)  # Blue for already classified
     else:
         bg_color = (0, 0, 0)    # Black for unclassified
-    
-    label = np.full((label_height, width, 3), bg_color, dtype=np.uint8)
+
+    label = np.full((label_height, width, channels), bg_color + (0,) * (channels - 3),
+                    dtype=np.uint8)
     font = cv2.FONT_HERSHEY_SIMPLEX
     text_color = (255, 255, 255)
-    
+
     # Add indicator for classified videos
     if classified:
         text = f"{text} ✓"
-    
+
     cv2.putText(label, text, (5, 20), font, 0.6, text_color, 1)
-    return np.vstack((frame, label))
+    _LABEL_CACHE[cache_key] = label
+    return label
+
+# Pre-rendered instruction overlays keyed by (video_name, model_status,
+# width, height); the overlay only changes when the selection does, so it is
+# rendered once and alpha-blended each tick
+_OVERLAY_CACHE = {}
+
+def _build_instruction_overlay(video_name, model_status, width, height, channels):
+    """Pre-render the classification overlay region and its blend factors"""
+    x0, y0 = 50, height//2 - 80
+    region = np.zeros((160, width - 100, channels), dtype=np.uint8)
 
-def draw_instruction_overlay(frame, video_name, model_status):
-    """Draw instruction overlay on the frame"""
-    overlay = frame.copy()
-    height, width = frame.shape[:2]
-    
-    # Semi-transparent background
-    cv2.rectangle(overlay, (50, height//2 - 80), (width - 50, height//2 + 80), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
-    
     # Instructions with better formatting
     font = cv2.FONT_HERSHEY_SIMPLEX
-    cv2.putText(frame, f"CLASSIFYING:", (60, height//2 - 50), font, 0.8, (255, 255, 0), 2)
-    cv2.putText(frame, f"{video_name}", (60, height//2 - 20), font, 0.7, (255, 255, 255), 2)
-    cv2.putText(frame, f"Model prediction: {model_status}", (60, height//2 + 10), font, 0.6, (200, 200, 200), 2)
-    cv2.putText(frame, "Press 'T' for FOUND, 'F' for NOT_FOUND", (60, height//2 + 40), font, 0.6, (0, 255, 0), 2)
-    cv2.putText(frame, "Press 'ESC' to cancel", (60, height//2 + 65), font, 0.5, (0, 255, 255), 1)
-    
+    cv2.putText(region, f"CLASSIFYING:", (10, 30), font, 0.8, (255, 255, 0), 2)
+    cv2.putText(region, f"{video_name}", (10, 60), font, 0.7, (255, 255, 255), 2)
+    cv2.putText(region, f"Model prediction: {model_status}", (10, 90), font, 0.6, (200, 200, 200), 2)
+    cv2.putText(region, "Press 'T' for FOUND, 'F' for NOT_FOUND", (10, 120), font, 0.6, (0, 255, 0), 2)
+    cv2.putText(region, "Press 'ESC' to cancel", (10, 145), font, 0.5, (0, 255, 255), 1)
+
+    # Semi-transparent black background, full-opacity text pixels
+    alpha = np.where(region.any(axis=2, keepdims=True), 1.0, 0.8).astype(np.float32)
+    premult = (region * alpha).astype(np.float32)
+    return premult, 1.0 - alpha, (x0, y0)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _blend_overlay(roi, premult, inv_alpha):
+        height, width, channels = roi.shape
+        for y in prange(height):
+            for x in range(width):
+                a = inv_alpha[y, x, 0]
+                for c in range(channels):
+                    roi[y, x, c] = np.uint8(premult[y, x, c] + roi[y, x, c] * a)
+else:
+    def _blend_overlay(roi, premult, inv_alpha):
+        roi[:] = premult + roi * inv_alpha
+
+def draw_instruction_overlay(frame, video_name, model_status):
+    """Blend the (cached) instruction overlay onto the frame"""
+    height, width, channels = frame.shape
+    cache_key = (video_name, model_status, width, height, channels)
+    entry = _OVERLAY_CACHE.get(cache_key)
+    if entry is None:
+        entry = _build_instruction_overlay(video_name, model_status, width, height, channels)
+        _OVERLAY_CACHE[cache_key] = entry
+
+    premult, inv_alpha, (x0, y0) = entry
+    h, w = premult.shape[:2]
+    _blend_overlay(frame[y0:y0 + h, x0:x0 + w], premult, inv_alpha)
+
     return frame
 
-def draw_status_bar(frame):
-    """Draw a status bar at the top"""
-    height, width = frame.shape[:2]
-    # Create status bar
-    status_bar = np.zeros((40, width, 3), dtype=np.uint8)
+def draw_status_bar(status_bar):
+    """Draw the status bar in place into the top rows of the canvas"""
+    status_bar[:] = 0
     font = cv2.FONT_HERSHEY_SIMPLEX
     
     # Show pause status
@@ -154,10 +222,8 @@ def draw_status_bar(frame):
         cv2.putText(status_bar, "Blue videos = already classified | Green = selected | Q will auto-classify remaining", 
                    (10, 30), font, 0.35, (200, 200, 200), 1)
     else:
-        cv2.putText(status_bar, f"{pause_text} Classification mode: Press T/F or ESC to cancel", 
+        cv2.putText(status_bar, f"{pause_text} Classification mode: Press T/F or ESC to cancel",
                    (10, 25), font, 0.5, (0, 255, 255), 1)
-    
-    return np.vstack((status_bar, frame))
 
 def mouse_callback(event, x, y, flags, param):
     global click_coords
@@ -190,37 +256,51 @@ def rewind_all_videos(caps, video_done):
         video_done[i] = False
     print("All videos rewound to beginning")
 
-def save_to_csv(original_name, model_status, manual_status, csv_filename="video_classifications.csv"):
-    """Save the classification data to CSV file"""
+# CSV file handle and writer held open for the whole session instead of
+# reopening the file for every row
+_csv_fp = None
+_csv_writer = None
+
+def open_csv_writer(csv_filename="video_classifications.csv"):
+    """Open the classification CSV once for the session"""
+    global _csv_fp, _csv_writer
     file_exists = os.path.isfile(csv_filename)
-    
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['video_name', 'model_status', 'manual_status']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        # Write header if file is new
-        if not file_exists:
-            writer.writeheader()
-        
-        # Write the data
-        writer.writerow({
-            'video_name': original_name,
-            'model_status': model_status,
-            'manual_status': manual_status
-        })
-    
+    _csv_fp = open(csv_filename, 'a', newline='', encoding='utf-8')
+    _csv_writer = csv.DictWriter(_csv_fp, fieldnames=['video_name', 'model_status', 'manual_status'])
+
+    # Write header if file is new
+    if not file_exists:
+        _csv_writer.writeheader()
+
+def close_csv_writer():
+    """Flush and close the session CSV"""
+    global _csv_fp, _csv_writer
+    if _csv_fp is not None:
+        _csv_fp.close()
+        _csv_fp = None
+        _csv_writer = None
+
+def save_to_csv(original_name, model_status, manual_status):
+    """Append one classification row to the session CSV"""
+    _csv_writer.writerow({
+        'video_name': original_name,
+        'model_status': model_status,
+        'manual_status': manual_status
+    })
+    _csv_fp.flush()
+
     print(f"✓ Saved: {original_name} | Model: {model_status} | Manual: {manual_status}")
 
-def save_unclassified_videos(video_info, csv_filename="video_classifications.csv"):
+def save_unclassified_videos(original_names, model_statuses):
     """Save all unclassified videos with their model status as manual status"""
     unclassified_count = 0
-    
-    for info in video_info:
-        if info['original_name'] not in classified_videos:
+
+    for original_name, model_status in zip(original_names, model_statuses):
+        if original_name not in classified_videos:
             save_to_csv(
-                info['original_name'], 
-                info['model_status'], 
-                info['model_status']  # Use model status as manual status for unclassified
+                original_name,
+                model_status,
+                model_status  # Use model status as manual status for unclassified
             )
             unclassified_count += 1
     
@@ -268,7 +348,7 @@ def print_summary(csv_filename="video_classifications.csv"):
         except Exception as e:
             print(f"Could not read summary from {csv_filename}: {e}")
 
-def main():
+def main(use_gpu=False):
     global click_coords, grid_info, pending_classification, paused, classified_videos
     
     base_path = os.path.expanduser("~/Downloads/managerVids")
@@ -300,6 +380,10 @@ def main():
     # Load existing classifications to avoid duplicates
     existing_classifications = load_existing_classifications()
 
+    # Keep the CSV open for the session; rows are appended and flushed as
+    # classifications happen
+    open_csv_writer()
+
     video_files = sorted(glob.glob(os.path.join(folder, "*.*")))
     video_files = [f for f in video_files if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
 
@@ -308,20 +392,32 @@ def main():
         return
 
     print(f"Found {len(video_files)} video files")
-    
-    caps = [cv2.VideoCapture(f) for f in video_files]
-    
-    # Extract labels and info for each video
-    video_info = []
+
+    if use_gpu and not gpu_decode_available():
+        print("⚠️ --gpu requested but OpenCV CUDA decode is unavailable, falling back to CPU")
+        use_gpu = False
+
+    if use_gpu:
+        # Decode on NVDEC; the GPU's decode engines time-slice many streams
+        # far faster than CPU cores can
+        print("Using GPU (NVDEC) decoding")
+        readers = [cv2.cudacodec.createVideoReader(f) for f in video_files]
+        caps = []
+    else:
+        readers = []
+        caps = [cv2.VideoCapture(f) for f in video_files]
+
+    # Per-video metadata as parallel lists (SoA) indexed by tile slot, so the
+    # hot loop does integer indexing instead of per-tile dict lookups
+    labels = []
+    original_names = []
+    model_statuses = []
     for f in video_files:
         label, original_name, model_status = extract_label_and_info(f)
-        video_info.append({
-            'file': f,
-            'label': label,
-            'original_name': original_name,
-            'model_status': model_status
-        })
-        
+        labels.append(label)
+        original_names.append(original_name)
+        model_statuses.append(model_status)
+
         # Mark as classified if already in CSV
         if original_name in existing_classifications:
             classified_videos.add(original_name)
@@ -330,7 +426,11 @@ def main():
         print(f"Found {len(classified_videos)} already classified videos (marked in blue)")
 
     frame_width, frame_height = 320, 240
-    video_done = [False] * len(caps)
+    video_done = [False] * len(video_files)
+
+    status_height = 40
+    label_height = 30
+    tile_height = frame_height + label_height
     
     # Calculate grid dimensions
     total = len(video_files)
@@ -346,95 +446,178 @@ def main():
         'rows': rows,
         'frame_width': frame_width,
         'frame_height': frame_height,
-        'total_videos': total,
-        'video_info': video_info
+        'total_videos': total
     }
 
     # Set up the window and mouse callback
     cv2.namedWindow("Video Classification Tool", cv2.WINDOW_AUTOSIZE)
     cv2.setMouseCallback("Video Classification Tool", mouse_callback)
 
+    tick = 0
+
+    def decode_one(i):
+        """Advance capture i and, on display ticks, decode into its cached tile"""
+        if video_done[i]:
+            return
+        if use_gpu:
+            ret, gpu_frame = readers[i].nextFrame()
+            if ret:
+                # Resize straight into this tile's ROI of the device mosaic
+                cv2.cuda.resize(gpu_frame, (frame_width, frame_height),
+                                dst=gpu_tiles[i])
+            else:
+                video_done[i] = True
+                gpu_tiles[i].setTo((0, 0, 0, 0))
+            return
+        # grab() advances the stream without decoding; only retrieve()
+        # (full decode) on display ticks
+        if caps[i].grab():
+            if tick % DECODE_INTERVAL == 0:
+                ret, raw = caps[i].retrieve()
+                if ret:
+                    # Resize straight into this tile's slice of the canvas
+                    cv2.resize(raw, (frame_width, frame_height), dst=tile_views[i])
+        else:
+            video_done[i] = True
+            tile_views[i][:] = 0
+
+    # OpenCV's FFmpeg backend releases the GIL during decode, so a thread
+    # pool gives real parallelism across captures
+    pool = ThreadPoolExecutor(max_workers=min(total, os.cpu_count() or 1))
+
+    # Preallocate the mosaic once and blit tiles/labels/status in place each
+    # tick instead of rebuilding it with hstack/vstack. The GPU path stays
+    # BGRA end-to-end (NVDEC output, imshow ignores the alpha byte) so no
+    # per-tick colour conversion is ever needed
+    channels = 4 if use_gpu else 3
+    canvas = np.zeros((status_height + rows * tile_height, cols * frame_width, channels),
+                      dtype=np.uint8)
+
+    # Per-tile views into the canvas; CPU decode resizes straight into them,
+    # so paused and skipped ticks leave the last decoded tile in place for free
+    tile_views = []
+    for i in range(total):
+        r, c = divmod(i, cols)
+        y = status_height + r * tile_height
+        x = c * frame_width
+        tile_views.append(canvas[y:y + frame_height, x:x + frame_width])
+
+    if use_gpu:
+        # Compose the tile mosaic on-device (NVDEC outputs BGRA) and download
+        # it with a single PCIe transfer per tick instead of one per tile
+        gpu_mosaic = cv2.cuda_GpuMat(rows * frame_height, cols * frame_width,
+                                     cv2.CV_8UC4)
+        gpu_mosaic.setTo((0, 0, 0, 0))
+        gpu_tiles = []
+        for i in range(total):
+            r, c = divmod(i, cols)
+            gpu_tiles.append(cv2.cuda_GpuMat(
+                gpu_mosaic,
+                (r * frame_height, (r + 1) * frame_height),
+                (c * frame_width, (c + 1) * frame_width)))
+        host_mosaic = np.empty((rows * frame_height, cols * frame_width, 4),
+                               dtype=np.uint8)
+    # Last (highlight, classified) state per tile so label strips are only
+    # re-rendered when their state actually changes
+    label_states = [None] * total
+
+    # Scratch buffer for classification mode so the overlay never dirties the
+    # clean canvas
+    display_buf = np.empty_like(canvas)
+
     try:
         while True:
-            frames = []
-            for i, (cap, info) in enumerate(zip(caps, video_info)):
-                if not video_done[i] and not paused:
-                    ret, frame = cap.read()
-                    if ret:
-                        frame = cv2.resize(frame, (frame_width, frame_height))
-                    else:
-                        video_done[i] = True
-                        frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
-                elif not video_done[i] and paused:
-                    # When paused, get current frame without advancing
-                    current_pos = cap.get(cv2.CAP_PROP_POS_FRAMES)
-                    ret, frame = cap.read()
-                    if ret:
-                        frame = cv2.resize(frame, (frame_width, frame_height))
-                        # Go back one frame to stay on current frame
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, current_pos)
-                    else:
-                        video_done[i] = True
-                        frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
-                else:
-                    frame = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+            t0 = time.perf_counter()
+
+            if not paused:
+                # Decode all tiles in parallel, then compose on the main thread
+                list(pool.map(decode_one, range(total)))
+                if use_gpu:
+                    # One download for the whole mosaic, still BGRA
+                    gpu_mosaic.download(host_mosaic)
+
+            for i in range(total):
+                r, c = divmod(i, cols)
+                y = status_height + r * tile_height
+                x = c * frame_width
+
+                if use_gpu:
+                    tile_views[i][:] = \
+                        host_mosaic[r * frame_height:(r + 1) * frame_height,
+                                    c * frame_width:(c + 1) * frame_width]
 
                 # Check if this video is highlighted or classified
-                highlight = (pending_classification is not None and 
+                highlight = (pending_classification is not None and
                             pending_classification['index'] == i)
-                classified = info['original_name'] in classified_videos
-                
-                labeled_frame = draw_label_below(frame, info['label'], 
-                                               width=frame_width, height=frame_height,
-                                               highlight=highlight, classified=classified)
-                frames.append(labeled_frame)
+                classified = original_names[i] in classified_videos
+
+                state = (highlight, classified)
+                if label_states[i] != state:
+                    canvas[y + frame_height:y + tile_height, x:x + frame_width] = \
+                        render_label_strip(labels[i], width=frame_width,
+                                           highlight=highlight, classified=classified,
+                                           channels=channels)
+                    label_states[i] = state
 
             if all(video_done) and not paused:
                 # Reset videos to loop
-                for i, cap in enumerate(caps):
-                    if video_done[i]:
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                if use_gpu:
+                    # NVDEC readers cannot seek, so recreate them
+                    for i, f in enumerate(video_files):
+                        readers[i] = cv2.cudacodec.createVideoReader(f)
                         video_done[i] = False
+                else:
+                    for i, cap in enumerate(caps):
+                        if video_done[i]:
+                            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            video_done[i] = False
 
-            # Pad with empty frames if needed
-            while len(frames) < rows * cols:
-                empty = np.zeros_like(frames[0])
-                frames.append(empty)
-
-            # Create grid
-            grid = []
-            for r in range(rows):
-                row = frames[r * cols:(r + 1) * cols]
-                grid.append(np.hstack(row))
-            final_img = np.vstack(grid)
-
-            # Add status bar
-            final_img = draw_status_bar(final_img)
+            # Redraw status bar in place
+            draw_status_bar(canvas[:status_height])
 
-            # If we're in classification mode, add overlay
+            # If we're in classification mode, blend the overlay into the
+            # scratch buffer so the clean canvas survives for the next tick
             if pending_classification is not None:
+                np.copyto(display_buf, canvas)
                 final_img = draw_instruction_overlay(
-                    final_img, 
+                    display_buf,
                     pending_classification['original_name'],
                     pending_classification['model_status']
                 )
+            else:
+                final_img = canvas
 
             cv2.imshow("Video Classification Tool", final_img)
-            
-            # Handle key presses
-            key = cv2.waitKey(30) & 0xFF
-            
+
+            # Pump UI events non-blockingly until the frame budget is spent
+            # instead of stalling a fixed 30 ms in waitKey
+            key = cv2.pollKey() & 0xFF
+            while key == 255:
+                remaining = TARGET_FRAME_TIME - (time.perf_counter() - t0)
+                if remaining <= 0:
+                    break
+                time.sleep(min(0.001, remaining))
+                key = cv2.pollKey() & 0xFF
+
+
             if key == ord('q') or key == ord('Q'):
                 # Save unclassified videos before quitting
                 print("\nSaving unclassified videos with model predictions...")
-                unclassified_count = save_unclassified_videos(video_info)
+                unclassified_count = save_unclassified_videos(original_names, model_statuses)
                 break
             elif key == ord(' '):  # Spacebar to pause/unpause
                 paused = not paused
                 status = "PAUSED" if paused else "RESUMED"
                 print(f"Video playback {status}")
             elif key == ord('r') or key == ord('R'):  # R to rewind
-                rewind_all_videos(caps, video_done)
+                if use_gpu:
+                    # NVDEC readers cannot seek, so recreate them
+                    for i, f in enumerate(video_files):
+                        readers[i] = cv2.cudacodec.createVideoReader(f)
+                        video_done[i] = False
+                    print("All videos rewound to beginning")
+                else:
+                    rewind_all_videos(caps, video_done)
             elif pending_classification is not None:
                 # We're in classification mode
                 if key == ord('t') or key == ord('T'):
@@ -468,33 +651,42 @@ def main():
                     x, y, cols, rows, frame_width, frame_height, total
                 )
                 
-                if clicked_index is not None and clicked_index < len(video_info):
-                    info = video_info[clicked_index]
-                    
+                if clicked_index is not None and clicked_index < total:
+                    original_name = original_names[clicked_index]
+                    model_status = model_statuses[clicked_index]
+
                     # Check if already classified
-                    if info['original_name'] in classified_videos:
-                        print(f"Video {info['original_name']} is already classified. Skipping...")
+                    if original_name in classified_videos:
+                        print(f"Video {original_name} is already classified. Skipping...")
                     else:
-                        print(f"Selected: {info['original_name']} (Model: {info['model_status']}) -> Press T/F to classify...")
-                        
+                        print(f"Selected: {original_name} (Model: {model_status}) -> Press T/F to classify...")
+
                         # Enter classification mode
                         pending_classification = {
                             'index': clicked_index,
-                            'original_name': info['original_name'],
-                            'model_status': info['model_status']
+                            'original_name': original_name,
+                            'model_status': model_status
                         }
                 
                 click_coords = None  # Reset click coordinates
 
+            tick += 1
+
     except KeyboardInterrupt:
         print("\nInterrupted by user")
         print("Saving unclassified videos with model predictions...")
-        save_unclassified_videos(video_info)
+        save_unclassified_videos(original_names, model_statuses)
     finally:
+        pool.shutdown(wait=True)
         for cap in caps:
             cap.release()
         cv2.destroyAllWindows()
+        close_csv_writer()
         print_summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Interactive video classification tool")
+    parser.add_argument("--gpu", action="store_true",
+                        help="Decode videos on the GPU via NVDEC (requires OpenCV built with CUDA)")
+    args = parser.parse_args()
+    main(use_gpu=args.gpu)
\ No newline at end of file
@@ -1,12 +1,14 @@
 import os
 import boto3
+from botocore.config import Config
 import json
 import re
 import random
+import zipfile
+from html import unescape
 import numpy as np
 import cv2
-from docx import Document
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
 
 # ====== CONFIGURATION ======
@@ -15,21 +17,53 @@ LOG_FILE = "downloaded_log.json"
 S3_BUCKET = "a2bvideos"
 AWS_REGION = "ap-south-1"
 BASE_DIR = os.path.expanduser("~/Downloads/managerVids")
+CHANNEL_LIST = ['channel502'] + [f'channel{i}' for i in range(602, 2403, 100)]
+MAX_PARALLEL_DOWNLOADS = 16
 # ===========================
 
+# S3 downloads are latency-bound, so a shared pool runs them concurrently;
+# threads are only spawned on first use
+_download_pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_DOWNLOADS)
+
+# Compiled once; parse_docx_group_by_HHMM runs against every paragraph and is
+# called repeatedly over a run
+_DETECTION_PATTERN = re.compile(r'channel(\d+)_([0-9]{8}T[0-9]{6})_manager_detections\.txt')
+
+# Parsed docx maps keyed by (path, mtime) so repeat calls are free unless the
+# document actually changed
+_PARSE_CACHE = {}
+
+_PARAGRAPH_PATTERN = re.compile(r'<w:p[ >].*?</w:p>', re.DOTALL)
+_RUN_TEXT_PATTERN = re.compile(r'<w:t(?: [^>]*)?>(.*?)</w:t>', re.DOTALL)
+
+def _iter_paragraph_texts(path):
+    """Yield the plain text of each paragraph in a .docx.
+
+    Reads word/document.xml straight out of the zip container instead of
+    building python-docx's full object model with per-run style parsing.
+    Run texts are joined per paragraph so tokens split across formatting
+    runs still match.
+    """
+    with zipfile.ZipFile(path) as z:
+        xml = z.read('word/document.xml').decode('utf-8')
+    for para in _PARAGRAPH_PATTERN.finditer(xml):
+        yield unescape(''.join(_RUN_TEXT_PATTERN.findall(para.group(0))))
+
 def parse_docx_group_by_HHMM(path):
-    doc = Document(path)
+    cache_key = (path, os.path.getmtime(path))
+    cached = _PARSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     hhmm_map = defaultdict(list)
-    pattern = r'channel(\d+)_([0-9]{8}T[0-9]{6})_manager_detections\.txt'
 
-    for para in doc.paragraphs:
-        text = para.text
+    for text in _iter_paragraph_texts(path):
         status = None
         if "'status': 'Found'" in text:
             status = 'found'
         elif "'status': 'Not Found'" in text:
             status = 'not_found'
-        matches = re.findall(pattern, text)
+        matches = _DETECTION_PATTERN.findall(text)
         for channel, full_ts in matches:
             hhmmss = full_ts[-6:]
             hhmm = hhmmss[:4]
@@ -40,17 +74,54 @@ def parse_docx_group_by_HHMM(path):
                 "hhmmss": hhmmss,
                 "status": status
             })
+
+    _PARSE_CACHE[cache_key] = hhmm_map
     return hhmm_map
 
 def load_log():
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'r') as f:
-            return set(json.load(f))
-    return set()
+    """Load downloaded keys; accepts the line format and the legacy JSON list"""
+    if not os.path.exists(LOG_FILE):
+        return set()
+    with open(LOG_FILE, 'r') as f:
+        content = f.read()
+    if content.lstrip().startswith('['):
+        # Legacy JSON list written by older runs. An interrupted run may have
+        # appended key lines after it, so parse just the list and union the
+        # trailing lines rather than json.loads-ing the whole file
+        legacy, end = json.JSONDecoder().raw_decode(content, content.index('['))
+        log_set = set(legacy)
+        log_set.update(line for line in content[end:].splitlines() if line)
+        # Compact immediately so appends never land after the JSON list again
+        save_log(log_set)
+        return log_set
+    return {line for line in content.splitlines() if line}
+
+def append_log(key):
+    """Durably record one downloaded key with an O(1) append"""
+    with open(LOG_FILE, 'a') as f:
+        f.write(key + '\n')
 
 def save_log(log_set):
+    """Compact the log to one deduplicated key per line"""
     with open(LOG_FILE, 'w') as f:
-        json.dump(list(log_set), f, indent=2)
+        f.writelines(key + '\n' for key in sorted(log_set))
+
+def make_s3_client():
+    """Create the session-wide S3 client.
+
+    The connection pool is sized to cover the download pool so parallel
+    transfers reuse warm TLS connections, with adaptive retries and TCP
+    keepalive instead of the defaults.
+    """
+    return boto3.client(
+        "s3",
+        region_name=AWS_REGION,
+        config=Config(
+            max_pool_connections=2 * MAX_PARALLEL_DOWNLOADS,
+            retries={"mode": "adaptive", "max_attempts": 5},
+            tcp_keepalive=True,
+        ),
+    )
 
 def download_from_s3(s3_client, key, destination):
     try:
@@ -78,42 +149,69 @@ def overlay_text(img, text):
     cv2.putText(overlay, text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
     return overlay
 
+def _download_one_key(s3_client, hhmm_map, downloaded_log, key):
+    """Download all channel videos for one (date, hhmm) key.
+
+    Mutates downloaded_log in place and returns the number of new downloads.
+    """
+    if key not in hhmm_map:
+        print(f"⚠️ Skipping {key}: not found in document.")
+        return 0
+
+    related_entries = hhmm_map[key]
+    date, hhmm = key
+    base_ts = f"{date}T{hhmm}"
+    folder_path = os.path.join(BASE_DIR, base_ts)
+    os.makedirs(folder_path, exist_ok=True)
+
+    # Index entries once instead of scanning the list per channel; keep the
+    # first entry per channel like the old next() scan did
+    by_channel = {}
+    for e in related_entries:
+        by_channel.setdefault(e["channel"], e)
+
+    pending = []
+    for channel in CHANNEL_LIST:
+        entry_match = by_channel.get(channel)
+
+        if entry_match:
+            full_ts = entry_match["full_ts"]
+            status = entry_match["status"]
+            filename = f"{channel}_{full_ts}.mkv"
+            s3_key = filename
+            new_filename = filename.replace(".mkv", f"_{status}.mkv")
+            local_path = os.path.join(folder_path, new_filename)
+
+            if s3_key in downloaded_log:
+                continue
+
+            pending.append((s3_key, local_path))
+        else:
+            print(f"ℹ️ No entry for {channel} at {date}{hhmm}")
+
+    # Download all videos for this key concurrently
+    new_downloads = 0
+    futures = {_download_pool.submit(download_from_s3, s3_client, s3_key, local_path): s3_key
+               for s3_key, local_path in pending}
+    for future in as_completed(futures):
+        if future.result():
+            s3_key = futures[future]
+            downloaded_log.add(s3_key)
+            # Append immediately so a crash never loses completed downloads;
+            # save_log compacts the file at the end of the run
+            append_log(s3_key)
+            new_downloads += 1
+
+    return new_downloads
+
 def download_videos_by_timestamps(selected_keys):
+    """One-shot helper: parse the docx, download the given keys, persist the log"""
     hhmm_map = parse_docx_group_by_HHMM(DOCX_FILE)
     downloaded_log = load_log()
-    s3 = boto3.client("s3", region_name=AWS_REGION)
-
-    channel_list = ['channel502'] + [f'channel{i}' for i in range(602, 2403, 100)]
+    s3 = make_s3_client()
 
     for key in selected_keys:
-        if key not in hhmm_map:
-            print(f"⚠️ Skipping {key}: not found in document.")
-            continue
-
-        related_entries = hhmm_map[key]
-        date, hhmm = key
-        base_ts = f"{date}T{hhmm}"
-        folder_path = os.path.join(BASE_DIR, base_ts)
-        os.makedirs(folder_path, exist_ok=True)
-
-        for channel in channel_list:
-            entry_match = next((e for e in related_entries if e["channel"] == channel), None)
-
-            if entry_match:
-                full_ts = entry_match["full_ts"]
-                status = entry_match["status"]
-                filename = f"{channel}_{full_ts}.mkv"
-                s3_key = filename
-                new_filename = filename.replace(".mkv", f"_{status}.mkv")
-                local_path = os.path.join(folder_path, new_filename)
-
-                if s3_key in downloaded_log:
-                    continue
-
-                if download_from_s3(s3, s3_key, local_path):
-                    downloaded_log.add(s3_key)
-            else:
-                print(f"ℹ️ No entry for {channel} at {date}{hhmm}")
+        _download_one_key(s3, hhmm_map, downloaded_log, key)
 
     save_log(downloaded_log)
     print("🎉 All downloads complete.")
@@ -127,31 +225,34 @@ def main():
             return
 
         found_count = 0
-        current_time = datetime.strptime(start_ts, "%Y%m%dT%H%M")
-        end_of_day = datetime.strptime(start_ts[:8] + "T2359", "%Y%m%dT%H%M")
-        selected_keys = []
+        start_date = start_ts[:8]
+        start_hhmm = start_ts[9:]
 
+        # Parse the docx and load the log once; the log lives in memory for
+        # the whole scan and is persisted once at the end
         hhmm_map = parse_docx_group_by_HHMM(DOCX_FILE)
         downloaded_log = load_log()
+        s3 = make_s3_client()
+
+        # Walk only the keys that actually exist in the document, from the
+        # starting timestamp to end of day, instead of probing all 1440 minutes
+        sorted_keys = sorted(k for k in hhmm_map
+                             if k[0] == start_date and k[1] >= start_hhmm)
+        if not sorted_keys:
+            print(f"⚠️ No DOCX entries at or after {start_ts}.")
 
-        while found_count < target_count and current_time <= end_of_day:
-            date_str = current_time.strftime("%Y%m%d")
-            hhmm_str = current_time.strftime("%H%M")
-            key = (date_str, hhmm_str)
-
-            if key in hhmm_map:
-                temp_log = set(downloaded_log)  # Snapshot before
-                download_videos_by_timestamps([key])
-                downloaded_log = load_log()  # Reload after
-                if len(downloaded_log) > len(temp_log):
-                    found_count += 1
-                    print(f"✅ Count {found_count}/{target_count} fulfilled at {key}")
-                else:
-                    print(f"ℹ️ No videos downloaded for {key}, skipping count.")
+        for key in sorted_keys:
+            new_downloads = _download_one_key(s3, hhmm_map, downloaded_log, key)
+            if new_downloads > 0:
+                found_count += 1
+                print(f"✅ Count {found_count}/{target_count} fulfilled at {key}")
             else:
-                print(f"⚠️ {key} not in DOCX entries, skipping.")
+                print(f"ℹ️ No videos downloaded for {key}, skipping count.")
+
+            if found_count >= target_count:
+                break
 
-            current_time += timedelta(minutes=1)
+        save_log(downloaded_log)
 
         if found_count < target_count:
             print(f"⏹️ Stopped at end of day. Only {found_count}/{target_count} timestamps fulfilled.")